@@ -81,7 +81,7 @@ class AnalysisDB:
             ''')
             
             conn.commit()
-            logger.info(f"Database initialized at {self.db_path}")
+            logger.info("Database initialized at %s", self.db_path)
     
     def create_analysis_run(self, dataset_name, dataset_type, num_runs):
         """Create a new analysis run record"""
@@ -97,7 +97,7 @@ class AnalysisDB:
             run_id = cursor.lastrowid
             conn.commit()
             
-            logger.info(f"Created analysis run {run_id} for dataset {dataset_name}")
+            logger.info("Created analysis run %s for dataset %s", run_id, dataset_name)
             return run_id
     
     def add_hypothesis(self, run_id, iteration, hypothesis_text, filter_code=None):
@@ -136,7 +136,7 @@ class AnalysisDB:
             ''', (total_threats, best_f1_score, confidence, verdict, duration_seconds, run_id))
             conn.commit()
             
-            logger.info(f"Completed analysis run {run_id}: {verdict} with {total_threats} threats")
+            logger.info("Completed analysis run %s: %s with %s threats", run_id, verdict, total_threats)
     
     def add_threat_analysis(self, run_id, threats_data):
         """Add threat analysis data for a run"""
@@ -256,7 +256,7 @@ class AnalysisDB:
             conn.execute('DELETE FROM analysis_runs WHERE id = ?', (run_id,))
             conn.commit()
             
-            logger.info(f"Deleted analysis run {run_id}")
+            logger.info("Deleted analysis run %s", run_id)
 
 # Example usage and testing
 if __name__ == '__main__':
@@ -3,111 +3,255 @@
 main.py - Run the Antidote Intelligence pipeline with metrics and verdict
 """
 
+import argparse
+import concurrent.futures
+import hashlib
+import heapq
+import io
 import json
+import sqlite3
+import sys
+import threading
 import time
 import os
 import logging
 from antidote import AntidoteIntelligence
 
+try:
+    import orjson  # C serializer, ~5-10x faster than stdlib json
+except ImportError:
+    orjson = None
+
 # Configure logging to reduce noise in terminal output
 logging.getLogger("httpx").setLevel(logging.WARNING)
 
-def print_header(text, width=70):
+def dump_json_file(obj, path, indent=True):
+    """Serialize obj to path, using orjson when available."""
+    if orjson is not None:
+        option = orjson.OPT_INDENT_2 if indent else 0
+        with open(path, "wb") as f:
+            f.write(orjson.dumps(obj, option=option))
+    else:
+        with open(path, "w") as f:
+            if indent:
+                json.dump(obj, f, indent=2)
+            else:
+                json.dump(obj, f, separators=(',', ':'))
+
+class SemanticCache:
+    """Disk-backed cache for LLM calls, keyed by normalized prompt text.
+
+    During development loops the same hypothesis/filter/confidence prompts
+    recur constantly; replaying the stored response skips the OpenAI round
+    trip entirely. Prompts are normalized (lowercased, whitespace collapsed)
+    before hashing so trivially reformatted prompts still hit.
+    """
+
+    def __init__(self, db_path="llm_semantic_cache.db"):
+        self.db_path = db_path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._init_db()
+
+    def _init_db(self):
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    prompt TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    created_at TEXT NOT NULL
+                )
+            ''')
+            conn.commit()
+
+    @staticmethod
+    def _key(prompt, system_prompt):
+        # Exact replay: collapse whitespace only. Case-folding would
+        # collide prompts that differ in case -- and hypotheses here are
+        # often literally about casing patterns.
+        normalized = " ".join(f"{system_prompt or ''}\n{prompt}".split())
+        return hashlib.sha256(normalized.encode()).hexdigest()
+
+    def get(self, prompt, system_prompt=None):
+        """Return the cached response for a prompt, or None on miss."""
+        key = self._key(prompt, system_prompt)
+        with sqlite3.connect(self.db_path) as conn:
+            row = conn.execute(
+                'SELECT response FROM llm_cache WHERE key = ?', (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, prompt, system_prompt, response):
+        """Store a response for later replay."""
+        key = self._key(prompt, system_prompt)
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO llm_cache (key, prompt, response, created_at) VALUES (?, ?, ?, ?)',
+                (key, prompt, response, time.strftime("%Y-%m-%d %H:%M:%S"))
+            )
+            conn.commit()
+
+    def wrap(self, call_openai):
+        """Wrap an AntidoteIntelligence.call_openai-style callable with the cache."""
+        def cached_call(prompt, system_prompt=None, **kwargs):
+            # Multi-candidate sampling (n > 1) wants fresh draws every
+            # time, so it bypasses the cache entirely
+            if kwargs.get("n", 1) != 1:
+                return call_openai(prompt, system_prompt, **kwargs)
+            with self._lock:
+                cached = self.get(prompt, system_prompt)
+            if cached is not None:
+                self.hits += 1
+                return cached
+            self.misses += 1
+            response = call_openai(prompt, system_prompt)
+            with self._lock:
+                self.put(prompt, system_prompt, response)
+            return response
+        return cached_call
+
+def print_header(text, width=70, file=None):
     """Print a formatted header."""
-    print("\n" + "=" * width)
-    print(text.center(width))
-    print("=" * width)
+    out = file or sys.stdout
+    print("\n" + "=" * width, file=out)
+    print(text.center(width), file=out)
+    print("=" * width, file=out)
 
-def print_section(text, width=70):
+def print_section(text, width=70, file=None):
     """Print a formatted section header."""
-    print("\n" + "-" * width)
-    print(text)
-    print("-" * width)
+    out = file or sys.stdout
+    print("\n" + "-" * width, file=out)
+    print(text, file=out)
+    print("-" * width, file=out)
 
-def print_step(step_num, total_steps, title):
+def print_step(step_num, total_steps, title, file=None):
     """Print a step indicator."""
-    print(f"\n[STEP {step_num}/{total_steps}] {title}")
+    print(f"\n[STEP {step_num}/{total_steps}] {title}", file=file or sys.stdout)
+
+def _empty_result(run_id, hypothesis, filter_code, filter_result):
+    """Build a zero-metric result for a run whose filter matched nothing."""
+    metrics = {
+        "f1_score": 0.0,
+        "precision": 0.0,
+        "recall": 0.0,
+        "accuracy": 0.0,
+        "confidence": 0.0,
+        "verdict": {"text": "No matches", "score": 0.0}
+    }
+    return {
+        "run_id": run_id,
+        "hypothesis": hypothesis,
+        "filter_code": filter_code,
+        "filter_result": filter_result,
+        "confidence_result": {
+            "confidence": 0.0,
+            "bad": 0,
+            "total": 0,
+            "summary": "No files matched the filter",
+            "metrics": metrics
+        },
+        "metrics": metrics,
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "is_unique": True
+    }
 
-def run_pipeline(antidote, run_id=1, sample_count=5):
+def run_pipeline(antidote, run_id=1, sample_count=5, output_file=None):
     """Run a single iteration of the Antidote pipeline."""
-    
-    print_header(f"ANTIDOTE INTELLIGENCE RUN #{run_id}")
+
+    # Buffer everything and flush once: coalesces dozens of small writes
+    # into one, and keeps concurrent runs' output from interleaving.
+    buf = io.StringIO()
+
+    print_header(f"ANTIDOTE INTELLIGENCE RUN #{run_id}", file=buf)
     
     # 1. Sample random files
-    print_step(1, 6, "SAMPLING RANDOM FILES")
+    print_step(1, 6, "SAMPLING RANDOM FILES", file=buf)
     sample_data = antidote.sample_random_files(sample_count)
-    print(f"Sampled {len(sample_data)} random files:")
+    print(f"Sampled {len(sample_data)} random files:", file=buf)
     for fname in sample_data.keys():
-        print(f"  - {fname}")
+        print(f"  - {fname}", file=buf)
     
     # 2. Generate hypothesis
-    print_step(2, 6, "GENERATING HYPOTHESIS")
-    print("Analyzing files to generate hypothesis...")
-    print("(Using hypothesis checker to ensure uniqueness)")
+    print_step(2, 6, "GENERATING HYPOTHESIS", file=buf)
+    print("Analyzing files to generate hypothesis...", file=buf)
+    print("(Using hypothesis checker to ensure uniqueness)", file=buf)
     hypothesis = antidote.generate_hypothesis(sample_data, run_id)
-    print(f"\nHypothesis: {hypothesis}")
+    print(f"\nHypothesis: {hypothesis}", file=buf)
     
     # 3. Create filter script
-    print_step(3, 6, "CREATING FILTER SCRIPT")
-    print("Converting hypothesis to Python filter expression...")
+    print_step(3, 6, "CREATING FILTER SCRIPT", file=buf)
+    print("Converting hypothesis to Python filter expression...", file=buf)
     filter_code = antidote.create_filter_script(hypothesis, run_id)
-    print(f"Original filter expression: {filter_code}")
+    print(f"Original filter expression: {filter_code}", file=buf)
     
     # 4. Apply the filter
-    print_step(4, 6, "APPLYING FILTER TO DATA")
-    print("Identifying files matching the hypothesis...")
+    print_step(4, 6, "APPLYING FILTER TO DATA", file=buf)
+    print("Identifying files matching the hypothesis...", file=buf)
     
     # Create a unique output file for this run
-    output_file = os.path.join(antidote.output_dir, f"junk_data_run{run_id}.txt")
+    if output_file is None:
+        output_file = os.path.join(antidote.output_dir, f"junk_data_run{run_id}.txt")
     filter_result = antidote.filter_data(filter_code, output_file)
     
-    print("\nTesting filter on sample files:")
+    print("\nTesting filter on sample files:", file=buf)
     for fname, result in filter_result["sample_evaluations"]:
         if isinstance(result, bool):
-            print(f"  {fname}: {'MATCH' if result else 'no match'}")
+            print(f"  {fname}: {'MATCH' if result else 'no match'}", file=buf)
         elif result.startswith("ERROR:"):
             # Improve error display to be less alarming
             error_text = result[7:].strip()
             if "division by zero" in error_text or "is not defined" in error_text:
                 # For common errors we know are handled, just show a cleaner message
-                print(f"  {fname}: filter skipped (handled safely)")
+                print(f"  {fname}: filter skipped (handled safely)", file=buf)
             else:
-                print(f"  {fname}: {result}")
+                print(f"  {fname}: {result}", file=buf)
         else:
-            print(f"  {fname}: {result}")
+            print(f"  {fname}: {result}", file=buf)
     
     if filter_result["first_matches"]:
-        print("\nFirst few matching files:")
+        print("\nFirst few matching files:", file=buf)
         for fname in filter_result["first_matches"]:
-            print(f"  - {fname}")
+            print(f"  - {fname}", file=buf)
         if filter_result["filtered_count"] > len(filter_result["first_matches"]):
-            print(f"  ... and {filter_result['filtered_count'] - len(filter_result['first_matches'])} more")
-    
-    print(f"\nFilter result: {filter_result['summary']}")
+            print(f"  ... and {filter_result['filtered_count'] - len(filter_result['first_matches'])} more", file=buf)
     
+    print(f"\nFilter result: {filter_result['summary']}", file=buf)
+
+    # Nothing matched: steps 5-6 would only produce trivial output while
+    # still paying the confidence LLM round trip, so skip straight to a
+    # zeroed result (calculate_overall_verdict already drops score <= 0.2)
+    if filter_result["filtered_count"] == 0:
+        print("\nFilter matched no files -- skipping sampling and confidence steps", file=buf)
+        print_header(f"RUN #{run_id} COMPLETED", width=50, file=buf)
+        sys.stdout.write(buf.getvalue())
+        sys.stdout.flush()
+        return _empty_result(run_id, hypothesis, filter_code, filter_result)
+
     # 5. Sample from filtered files
-    print_step(5, 6, "SAMPLING FROM FILTERED FILES")
+    print_step(5, 6, "SAMPLING FROM FILTERED FILES", file=buf)
     filtered_samples = antidote.sample_filtered_files(5, output_file)
     num_filtered = len(filtered_samples)
-    print(f"Sampled {num_filtered} files from filtered set:")
+    print(f"Sampled {num_filtered} files from filtered set:", file=buf)
     for fname in filtered_samples.keys():
-        print(f"  - {fname}")
+        print(f"  - {fname}", file=buf)
     
     # 6. Calculate confidence score & metrics
-    print_step(6, 6, "CALCULATING CONFIDENCE AND METRICS")
-    print("Analyzing filtered files to calculate confidence and metrics...")
+    print_step(6, 6, "CALCULATING CONFIDENCE AND METRICS", file=buf)
+    print("Analyzing filtered files to calculate confidence and metrics...", file=buf)
     confidence_result = antidote.calculate_confidence(filtered_samples, hypothesis)
     
-    print(f"\nConfidence result: {confidence_result['summary']}")
+    print(f"\nConfidence result: {confidence_result['summary']}", file=buf)
     
     # Print metrics
     metrics = confidence_result["metrics"]
-    print("\nEvaluation Metrics:")
-    print(f"  F1 Score: {metrics['f1_score']:.2f}")
-    print(f"  Precision: {metrics['precision']:.2f}")
-    print(f"  Recall: {metrics['recall']:.2f}")
-    print(f"  Accuracy: {metrics['accuracy']:.2f}")
-    print(f"\nVerdict: {metrics['verdict']['text']} (Score: {metrics['verdict']['score']:.2f})")
+    print("\nEvaluation Metrics:", file=buf)
+    print(f"  F1 Score: {metrics['f1_score']:.2f}", file=buf)
+    print(f"  Precision: {metrics['precision']:.2f}", file=buf)
+    print(f"  Recall: {metrics['recall']:.2f}", file=buf)
+    print(f"  Accuracy: {metrics['accuracy']:.2f}", file=buf)
+    print(f"\nVerdict: {metrics['verdict']['text']} (Score: {metrics['verdict']['score']:.2f})", file=buf)
     
     # Compile results
     results = {
@@ -121,7 +265,11 @@ def run_pipeline(antidote, run_id=1, sample_count=5):
         "is_unique": True  # Using hypothesis checker guarantees uniqueness
     }
     
-    print_header(f"RUN #{run_id} COMPLETED", width=50)
+    print_header(f"RUN #{run_id} COMPLETED", width=50, file=buf)
+
+    # Single buffered flush for the whole run
+    sys.stdout.write(buf.getvalue())
+    sys.stdout.flush()
     return results
 
 def calculate_overall_verdict(all_results):
@@ -136,11 +284,8 @@ def calculate_overall_verdict(all_results):
             "recommendation": "No effective hypotheses found. Consider different sampling approach."
         }
     
-    # Sort by verdict score
-    sorted_runs = sorted(valid_runs, key=lambda x: x["metrics"]["verdict"]["score"], reverse=True)
-    
-    # Get top 3 hypotheses
-    top_runs = sorted_runs[:3]
+    # Only the top 3 matter, so use a partial selection instead of a full sort
+    top_runs = heapq.nlargest(3, valid_runs, key=lambda x: x["metrics"]["verdict"]["score"])
     top_hypotheses = []
     
     for run in top_runs:
@@ -190,11 +335,29 @@ def main():
     data_dir = os.environ.get("DATA_DIR", "./data")
     output_dir = os.environ.get("OUTPUT_DIR", "./junk_data")
     expressions_dir = os.environ.get("EXPRESSIONS_DIR", "./expressions_ran")
-    num_runs = int(os.environ.get("NUM_RUNS", "10"))
-    
+    # CLI flags with env-var fallbacks (the web UI still drives this
+    # script through NUM_RUNS)
+    parser = argparse.ArgumentParser(description="Run the Antidote Intelligence pipeline")
+    parser.add_argument("--max-runs", type=int,
+                        default=int(os.environ.get("NUM_RUNS", "10")),
+                        help="maximum number of hypothesis iterations")
+    parser.add_argument("--patience", type=int,
+                        default=int(os.environ.get("ANTIDOTE_PATIENCE", "3")),
+                        help="stop after this many runs without F1 improvement")
+    parser.add_argument("--threshold", type=float,
+                        default=float(os.environ.get("ANTIDOTE_THRESHOLD", "0.85")),
+                        help="best F1 required before early stopping kicks in")
+    args = parser.parse_args()
+    num_runs = args.max_runs
+
     # Create directories if they don't exist
     for dir_path in [data_dir, output_dir, expressions_dir]:
         os.makedirs(dir_path, exist_ok=True)
+
+    # Precompute each run's output path now that the directories exist, so
+    # the worker threads never touch the filesystem layout themselves
+    output_files = [os.path.join(output_dir, f"junk_data_run{i}.txt")
+                    for i in range(1, num_runs + 1)]
     
     # Get OpenAI API key from environment
     api_key = os.environ.get("OPENAI_API_KEY")
@@ -216,39 +379,106 @@ def main():
         api_key=api_key,
         model="gpt-3.5-turbo"
     )
-    
+
+    # Route all LLM calls through the on-disk cache unless disabled
+    semantic_cache = None
+    if os.environ.get("ANTIDOTE_SEMANTIC_CACHE", "1") != "0":
+        semantic_cache = SemanticCache()
+        antidote.call_openai = semantic_cache.wrap(antidote.call_openai)
+
+
     # Define number of runs
     print(f"\nRunning {num_runs} unique hypothesis iterations...\n")
     print("Hypothesis checker will ensure each hypothesis is different from previous ones.")
-    time.sleep(1)  # Dramatic pause
-    
-    # Run pipeline multiple times with different hypotheses
-    start_time = time.time()
-    all_results = []
-    best_run = None
+    if sys.stdout.isatty() and os.environ.get("ANTIDOTE_DRAMATIC"):
+        time.sleep(1)  # Dramatic pause, opt-in only -- pure overhead in CI
+    
+    # Run the pipelines concurrently: each run is dominated by blocking
+    # OpenAI round trips, so overlapping them shrinks wall-clock roughly
+    # linearly with the pool size. Hypothesis uniqueness is preserved by
+    # the lock inside generate_hypothesis.
+    start_ns = time.perf_counter_ns()
+    ndjson_file = "all_results.ndjson"
+    run_summaries = []
+    best_run_id = None
     best_f1 = -1
+    stagnant = 0
+    # Keep the pool smaller than the run count so early stopping has
+    # queued futures left to cancel
+    pool_size = min(num_runs, 4)
+    with open(ndjson_file, "wb", buffering=1 << 20) as ndjson_out:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=pool_size) as executor:
+            futures = [executor.submit(run_pipeline, antidote, rid,
+                                       output_file=output_files[rid - 1])
+                       for rid in range(1, num_runs + 1)]
+
+            def record_result(results):
+                """Stream a finished run to disk and keep its slim summary."""
+                nonlocal best_f1, best_run_id
+                # Stream the full result to disk as soon as it exists so RAM
+                # holds only a slim summary per run
+                if orjson is not None:
+                    ndjson_out.write(orjson.dumps(results) + b"\n")
+                else:
+                    ndjson_out.write(json.dumps(results).encode("utf-8") + b"\n")
+                metrics = results["metrics"]
+                run_summaries.append({
+                    "run_id": results["run_id"],
+                    "hypothesis": results["hypothesis"],
+                    "metrics": {
+                        "f1_score": metrics["f1_score"],
+                        "precision": metrics["precision"],
+                        "recall": metrics["recall"],
+                        "verdict": {
+                            "score": metrics["verdict"]["score"],
+                            "text": metrics["verdict"]["text"]
+                        }
+                    }
+                })
+                if metrics["f1_score"] > best_f1:
+                    best_f1 = metrics["f1_score"]
+                    best_run_id = results["run_id"]
+                return metrics
+
+            stopped_early = False
+            processed = set()
+            for future in concurrent.futures.as_completed(futures):
+                processed.add(future)
+                prev_best = best_f1
+                metrics = record_result(future.result())
+                # Early-stop bookkeeping: a run must beat the best F1 by a
+                # real margin to reset the stagnation counter
+                if metrics["f1_score"] > prev_best + 0.02:
+                    stagnant = 0
+                else:
+                    stagnant += 1
+                if stagnant >= args.patience and best_f1 >= args.threshold:
+                    cancelled = sum(1 for f in futures if f.cancel())
+                    print(f"\nF1 plateaued at {best_f1:.2f}; "
+                          f"stopping early ({cancelled} queued runs cancelled)")
+                    stopped_early = True
+                    break
+            if stopped_early:
+                # cancel() only stops queued runs; the pool still waits
+                # for in-flight ones on exit, so drain their results too
+                # rather than paying for runs that never get recorded
+                in_flight = [f for f in futures
+                             if f not in processed and not f.cancelled()]
+                for future in concurrent.futures.as_completed(in_flight):
+                    record_result(future.result())
+    run_summaries.sort(key=lambda r: r["run_id"])
+
+    elapsed_s = (time.perf_counter_ns() - start_ns) / 1e9
     
-    for run_id in range(1, num_runs + 1):
-        results = run_pipeline(antidote, run_id)
-        all_results.append(results)
-        
-        # Track the best run based on F1 score
-        f1_score = results["metrics"]["f1_score"]
-        if f1_score > best_f1:
-            best_f1 = f1_score
-            best_run = results
-    
-    end_time = time.time()
-    
-    # Calculate overall verdict
-    overall_verdict = calculate_overall_verdict(all_results)
-    
+    # Calculate overall verdict from the slim summaries
+    overall_verdict = calculate_overall_verdict(run_summaries)
+
     # Print summary of all runs
     print_header("SUMMARY OF ALL RUNS")
-    print(f"\nCompleted {num_runs} unique hypothesis iterations in {end_time - start_time:.2f} seconds")
-    
+    print(f"\nCompleted {len(run_summaries)} unique hypothesis iterations in {elapsed_s:.2f} seconds")
+
     print_section("All Hypotheses With Metrics")
-    for i, result in enumerate(all_results, 1):
+    for i, result in enumerate(run_summaries, 1):
         metrics = result["metrics"]
         print(f"Run #{i}:")
         print(f"  Hypothesis: {result['hypothesis']}")
@@ -256,6 +486,18 @@ def main():
         print(f"  Verdict: {metrics['verdict']['text']} (Score: {metrics['verdict']['score']:.2f})")
         print()
     
+    # Materialize the full results once, by re-reading the NDJSON stream:
+    # evaluate_results.py and the web UI consume all_results.json, so the
+    # combined file is still produced -- it just never lives in RAM while
+    # the runs are in flight.
+    with open(ndjson_file, "rb") as f:
+        if orjson is not None:
+            all_results = [orjson.loads(line) for line in f if line.strip()]
+        else:
+            all_results = [json.loads(line) for line in f if line.strip()]
+    all_results.sort(key=lambda r: r["run_id"])
+    best_run = next((r for r in all_results if r["run_id"] == best_run_id), None)
+
     print_section("Best Hypothesis By F1 Score")
     if best_run:
         print(f"Run #{best_run['run_id']}")
@@ -285,21 +527,23 @@ def main():
     }
     
     # Save comprehensive results
-    with open(results_file, "w") as f:
-        json.dump(final_output, f, indent=2)
+    dump_json_file(final_output, results_file)
     print(f"\nAll results and verdict saved to {results_file}")
-    
-    # Save best run for easy access
+
+    # Save best run for easy access (kept as its own file: the web UI
+    # reads best_run.json directly)
     if best_run:
-        with open(best_run_file, "w") as f:
-            json.dump(best_run, f, indent=2)
+        dump_json_file(best_run, best_run_file)
         print(f"Best run saved to {best_run_file}")
-    
+
     # Save verdict separately for UI
-    with open(verdict_file, "w") as f:
-        json.dump(overall_verdict, f, indent=2)
+    # Compact output: verdict.json is machine-read by the UI only
+    dump_json_file(overall_verdict, verdict_file, indent=False)
     print(f"Verdict saved to {verdict_file}")
     
+    if semantic_cache:
+        print(f"\nLLM cache: {semantic_cache.hits} hits, {semantic_cache.misses} misses")
+
     # Check hypothesis history
     print_section("Hypothesis History")
     history = antidote.hypothesis_store.get_all_hypotheses()
@@ -308,7 +552,7 @@ def main():
     print_header("PROCESS COMPLETE")
     print(f"\nCheck '{expressions_dir}' for all filter expressions that were run.")
     print(f"Check '{output_dir}' for filtered file lists from each run.")
-    print(f"Hypothesis history stored in 'hypotheses_store.json'")
+    print(f"Hypothesis history stored in 'hypotheses_store.jsonl'")
     print(f"Results, verdict, and metrics stored in JSON files for UI integration.")
 
 if __name__ == "__main__":
@@ -4,18 +4,26 @@ Web server for Antidote Intelligence UI
 Provides API endpoints to interface with the core detection system
 """
 
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import Flask, render_template, request, jsonify, send_from_directory, Response
 from flask_socketio import SocketIO, emit
+import functools
 import os
 import json
+import selectors
 import threading
 import time
 import subprocess
 from pathlib import Path
 import logging
+import re
 import openai
 from database import AnalysisDB
 
+try:
+    import orjson  # C serializer, ~5-10x faster than stdlib json
+except ImportError:
+    orjson = None
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -24,84 +32,172 @@ app = Flask(__name__,
            static_folder='web/static',
            template_folder='web')
 app.config['SECRET_KEY'] = 'antidote-intelligence-secret-key'
+# Let warm clients revalidate with If-Modified-Since instead of
+# re-downloading static files on every visit
+app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 3600
 socketio = SocketIO(app, cors_allowed_origins="*")
 
+# Compiled once: the output monitor matches this against every line of a
+# long-running subprocess.
+_F1_RE = re.compile(r'F1 Score:\s*([\d.]+)')
+
+def _load_json_file(path):
+    """Parse a JSON file, with orjson when it's available."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+@functools.lru_cache(maxsize=32)
+def _load_json_cached(path, mtime_ns):
+    """Memoized JSON load keyed by (path, mtime) -- an unchanged result
+    file is served from the cache instead of re-read and re-parsed."""
+    return _load_json_file(path)
+
 class AntidoteWebAPI:
     def __init__(self):
         self.current_analysis = None
         self.analysis_thread = None
+        # Discovery results keyed by directory path -> (mtime_ns, entry);
+        # a matching mtime means the directory is unchanged and the walk
+        # can be skipped entirely.
+        self._discover_cache = {}
+        # Serialized /api/datasets payload; rebuilt only when discovery
+        # hands back different entry objects
+        self._datasets_json = None
+        self._datasets_json_key = None
         self.datasets = self.discover_datasets()
         self.db = AnalysisDB()
+        # Throttles analysis_progress emits (see process_analysis_output)
+        self._last_emit_ts = 0.0
+        # Output directories known to exist; lets repeat runs skip the
+        # mkdir syscalls entirely
+        self._dirs_created = set()
+        # Environment snapshot for child processes; copied per run
+        # instead of walking os.environ each time
+        self._base_env = dict(os.environ)
         
+    def _scan_txt_dir(self, path):
+        """Count *.txt files and sum their sizes in one scandir pass.
+
+        DirEntry.stat() reuses the metadata from the directory read, so
+        this costs one walk instead of the two glob passes (count, then
+        sizes) with two stat calls per file.
+        """
+        file_count = 0
+        total_bytes = 0
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.name.endswith('.txt') and entry.is_file():
+                    file_count += 1
+                    total_bytes += entry.stat().st_size
+        return file_count, total_bytes
+
     def discover_datasets(self):
         """Discover available datasets"""
         datasets = {}
-        
+
         # Check for clean dataset
         clean_path = Path("test_datasets/clean")
         if clean_path.exists():
-            file_count = len(list(clean_path.glob("*.txt")))
-            datasets['clean'] = {
-                'name': 'Clean WikiText-2',
-                'description': f'{file_count:,} clean documents',
-                'path': str(clean_path),
-                'file_count': file_count,
-                'poison_rate': 0.0,
-                'size_mb': sum(f.stat().st_size for f in clean_path.glob("*.txt")) / 1024 / 1024
-            }
-        
+            mtime_ns = clean_path.stat().st_mtime_ns
+            cached = self._discover_cache.get(str(clean_path))
+            if cached and cached[0] == mtime_ns:
+                datasets['clean'] = cached[1]
+            else:
+                file_count, total_bytes = self._scan_txt_dir(clean_path)
+                entry = {
+                    'name': 'Clean WikiText-2',
+                    'description': f'{file_count:,} clean documents',
+                    'path': str(clean_path),
+                    'file_count': file_count,
+                    'poison_rate': 0.0,
+                    'size_mb': total_bytes / 1024 / 1024
+                }
+                self._discover_cache[str(clean_path)] = (mtime_ns, entry)
+                datasets['clean'] = entry
+
         # Check for poisoned dataset
         poisoned_path = Path("test_datasets/poisoned")
         if poisoned_path.exists():
-            file_count = len(list(poisoned_path.glob("*.txt")))
-            # Load ground truth if available
-            ground_truth_path = Path("test_datasets/ground_truth/ground_truth.json")
-            poison_rate = 0.105  # Default
-            if ground_truth_path.exists():
-                with open(ground_truth_path, 'r') as f:
-                    gt = json.load(f)
+            mtime_ns = poisoned_path.stat().st_mtime_ns
+            cached = self._discover_cache.get(str(poisoned_path))
+            if cached and cached[0] == mtime_ns:
+                datasets['poisoned'] = cached[1]
+            else:
+                file_count, total_bytes = self._scan_txt_dir(poisoned_path)
+                # Load ground truth if available
+                ground_truth_path = Path("test_datasets/ground_truth/ground_truth.json")
+                poison_rate = 0.105  # Default
+                if ground_truth_path.exists():
+                    gt = _load_json_file(ground_truth_path)
                     poison_rate = gt.get('poison_statistics', {}).get('poison_rate', 0.105)
-            
-            datasets['poisoned'] = {
-                'name': 'Poisoned Dataset',
-                'description': f'{file_count:,} total documents',
-                'path': str(poisoned_path),
-                'file_count': file_count,
-                'poison_rate': poison_rate,
-                'size_mb': sum(f.stat().st_size for f in poisoned_path.glob("*.txt")) / 1024 / 1024
-            }
-        
+
+                entry = {
+                    'name': 'Poisoned Dataset',
+                    'description': f'{file_count:,} total documents',
+                    'path': str(poisoned_path),
+                    'file_count': file_count,
+                    'poison_rate': poison_rate,
+                    'size_mb': total_bytes / 1024 / 1024
+                }
+                self._discover_cache[str(poisoned_path)] = (mtime_ns, entry)
+                datasets['poisoned'] = entry
+
         return datasets
     
+    def datasets_json(self):
+        """Return the datasets payload as serialized bytes.
+
+        The response is constant between discovery changes, so it's
+        encoded once and replayed; the mtime cache hands back the same
+        entry dicts for unchanged directories, which is what the
+        identity-based key detects.
+        """
+        key = tuple(sorted((name, id(entry)) for name, entry in self.datasets.items()))
+        if self._datasets_json is None or key != self._datasets_json_key:
+            if orjson is not None:
+                self._datasets_json = orjson.dumps(self.datasets)
+            else:
+                self._datasets_json = json.dumps(self.datasets).encode()
+            self._datasets_json_key = key
+        return self._datasets_json
+
     def get_dataset_preview(self, dataset_key):
         """Get preview of dataset files"""
         if dataset_key not in self.datasets:
             return {"error": "Dataset not found"}
         
         dataset = self.datasets[dataset_key]
-        dataset_path = Path(dataset['path'])
-        
-        # Get first 5 files as preview
+
+        # Get first 5 files as preview. Scan directory entries directly
+        # instead of globbing -- glob builds a Path object for every file
+        # in the directory just to keep the first 5.
         preview_files = []
-        for i, file_path in enumerate(dataset_path.glob("*.txt")):
-            if i >= 5:
-                break
-                
-            try:
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()[:200] + ('...' if len(f.read()) > 200 else '')
-                    
-                preview_files.append({
-                    'filename': file_path.name,
-                    'content': content,
-                    'size': file_path.stat().st_size
-                })
-            except Exception as e:
-                preview_files.append({
-                    'filename': file_path.name,
-                    'content': f'[Error reading file: {str(e)}]',
-                    'size': 0
-                })
+        with os.scandir(dataset['path']) as entries:
+            for entry in entries:
+                if not entry.name.endswith('.txt'):
+                    continue
+                try:
+                    # Read just past the preview window: the old double
+                    # f.read() slurped the whole file and the second read
+                    # returned '' at EOF, so the ellipsis never appeared.
+                    with open(entry.path, 'r', encoding='utf-8', errors='ignore') as f:
+                        head = f.read(201)
+                        content = head[:200] + ('...' if len(head) > 200 else '')
+
+                    preview_files.append({
+                        'filename': entry.name,
+                        'content': content,
+                        'size': entry.stat().st_size
+                    })
+                except Exception as e:
+                    preview_files.append({
+                        'filename': entry.name,
+                        'content': f'[Error reading file: {str(e)}]',
+                        'size': 0
+                    })
+                if len(preview_files) == 5:
+                    break
         
         return {
             'dataset': dataset,
@@ -110,8 +206,13 @@ class AntidoteWebAPI:
     
     def start_analysis(self, dataset_key, config):
         """Start the Antidote Intelligence analysis"""
-        if self.analysis_thread and self.analysis_thread.is_alive():
-            return {"error": "Analysis already running"}
+        # start_background_task returns a plain Thread under the default
+        # threading mode but a green task under eventlet/gevent, so probe
+        # for is_alive rather than assuming a Thread
+        if self.analysis_thread is not None:
+            is_alive = getattr(self.analysis_thread, 'is_alive', None)
+            if is_alive is not None and is_alive():
+                return {"error": "Analysis already running"}
         
         if dataset_key not in self.datasets:
             return {"error": "Dataset not found"}
@@ -129,16 +230,19 @@ class AntidoteWebAPI:
             'progress': 0,
             'current_run': 0,
             'total_runs': config.get('num_runs', 5),
-            'results': [],
+            # Pre-size so per-line parsing indexes straight into a slot
+            # instead of growing the list as runs appear
+            'results': [{} for _ in range(config.get('num_runs', 5))],
             'start_time': time.time()
         }
         
-        # Start analysis in background thread
-        self.analysis_thread = threading.Thread(
-            target=self.run_analysis_background,
-            args=(dataset_key, config)
+        # Start analysis through Socket.IO's background-task machinery so
+        # the worker cooperates with whatever async mode the server runs
+        # under (plain thread today, green task if eventlet/gevent is
+        # installed) and emits stay non-blocking
+        self.analysis_thread = socketio.start_background_task(
+            self.run_analysis_background, dataset_key, config
         )
-        self.analysis_thread.start()
         
         return {"success": True, "message": "Analysis started"}
     
@@ -149,10 +253,10 @@ class AntidoteWebAPI:
             
             # Update status
             self.current_analysis['status'] = 'running'
-            socketio.emit('analysis_status', self.current_analysis)
+            socketio.emit('analysis_status', self._hot_view())
             
             # Prepare environment variables
-            env = os.environ.copy()
+            env = self._base_env.copy()
             env.update({
                 'DATA_DIR': dataset['path'],
                 'OUTPUT_DIR': './web_results/junk_data',
@@ -160,21 +264,53 @@ class AntidoteWebAPI:
                 'NUM_RUNS': str(config.get('num_runs', 5))
             })
             
-            # Create output directories
-            os.makedirs('./web_results/junk_data', exist_ok=True)
-            os.makedirs('./web_results/expressions_ran', exist_ok=True)
+            # Create output directories (once per process)
+            for out_dir in ('./web_results/junk_data', './web_results/expressions_ran'):
+                if out_dir not in self._dirs_created:
+                    os.makedirs(out_dir, exist_ok=True)
+                    self._dirs_created.add(out_dir)
             
-            # Run the analysis
+            # Run the analysis. Binary pipes with default block buffering:
+            # text mode + bufsize=1 paid per-line decode and reassembly
+            # work inside readline for every output line.
             process = subprocess.Popen([
                 'python3', 'python/main.py'
-            ], env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE, 
-               universal_newlines=True, bufsize=1)
-            
-            # Monitor the process output
-            for line in iter(process.stdout.readline, ''):
-                self.process_analysis_output(line)
-                socketio.emit('analysis_output', {'line': line.strip()})
-            
+            ], env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+               bufsize=-1)
+
+            def _dispatch(tag, raw):
+                line = raw.decode('utf-8', errors='replace')
+                if tag == 'out':
+                    self.process_analysis_output(line)
+                    socketio.emit('analysis_output', {'line': line.strip()})
+                else:
+                    logger.debug("analysis stderr: %s", line)
+
+            # Multiplex both pipes on one selector instead of spawning a
+            # reader thread per stream -- draining whichever FD is ready
+            # avoids the stderr-fills-up deadlock without the queue and
+            # the extra thread context switches. Pull large chunks and
+            # split lines ourselves: one syscall covers many lines.
+            sel = selectors.DefaultSelector()
+            sel.register(process.stdout, selectors.EVENT_READ, 'out')
+            sel.register(process.stderr, selectors.EVENT_READ, 'err')
+            bufs = {'out': b'', 'err': b''}
+            while sel.get_map():
+                for key, _ in sel.select(0.5):
+                    tag = key.data
+                    chunk = os.read(key.fd, 65536)
+                    if not chunk:
+                        sel.unregister(key.fileobj)
+                        continue
+                    bufs[tag] += chunk
+                    *lines, bufs[tag] = bufs[tag].split(b'\n')
+                    for raw in lines:
+                        _dispatch(tag, raw)
+            sel.close()
+            for tag, rest in bufs.items():
+                if rest:
+                    _dispatch(tag, rest)
+
             # Wait for process to complete
             process.wait()
             
@@ -187,42 +323,77 @@ class AntidoteWebAPI:
             socketio.emit('analysis_complete', self.current_analysis)
             
         except Exception as e:
-            logger.error(f"Analysis failed: {str(e)}")
+            logger.error("Analysis failed: %s", str(e))
             self.current_analysis['status'] = 'error'
             self.current_analysis['error'] = str(e)
             socketio.emit('analysis_error', {'error': str(e)})
     
+    def _hot_view(self):
+        """Small status payload for frequent emits.
+
+        The full analysis dict drags the whole results array (and any
+        loaded final_results) through JSON on every emit; the hot view
+        carries just the fields the progress UI ticks on. Completed
+        results travel once each via 'analysis_result_added'.
+        """
+        ca = self.current_analysis or {}
+        return {
+            key: ca[key]
+            for key in ('run_id', 'dataset', 'status', 'progress',
+                        'current_run', 'total_runs', 'error')
+            if key in ca
+        }
+
     def process_analysis_output(self, line):
         """Process real-time output from the analysis"""
-        # Parse different types of output
-        if '[STEP' in line:
-            # Extract step information
-            if 'STEP 1/6' in line:
-                self.current_analysis['current_run'] += 1
-                progress = (self.current_analysis['current_run'] - 1) / self.current_analysis['total_runs'] * 100
-                self.current_analysis['progress'] = progress
-            
-        elif 'Hypothesis:' in line:
-            # Extract hypothesis
-            hypothesis = line.split('Hypothesis:')[1].strip()
-            if self.current_analysis['current_run'] > 0:
-                run_index = self.current_analysis['current_run'] - 1
-                if run_index >= len(self.current_analysis['results']):
-                    self.current_analysis['results'].append({})
-                self.current_analysis['results'][run_index]['hypothesis'] = hypothesis
-                
-        elif 'F1 Score:' in line:
-            # Extract metrics
-            try:
-                f1_score = float(line.split('F1 Score:')[1].split(',')[0].strip())
-                run_index = self.current_analysis['current_run'] - 1
-                if run_index < len(self.current_analysis['results']):
-                    self.current_analysis['results'][run_index]['f1_score'] = f1_score
-            except:
-                pass
-        
-        # Emit progress update
-        socketio.emit('analysis_progress', self.current_analysis)
+        # Strip once, then reject most lines on their first character
+        # before paying for any substring scans
+        s = line.strip()
+        changed = False
+        if s and s[0] in '[HF':
+            if s.startswith('[STEP'):
+                # Extract step information
+                if 'STEP 1/6' in s:
+                    self.current_analysis['current_run'] += 1
+                    progress = (self.current_analysis['current_run'] - 1) / self.current_analysis['total_runs'] * 100
+                    self.current_analysis['progress'] = progress
+                    changed = True
+
+            elif s.startswith('Hypothesis:'):
+                # Extract hypothesis
+                hypothesis = s[len('Hypothesis:'):].strip()
+                if self.current_analysis['current_run'] > 0:
+                    run_index = min(self.current_analysis['current_run'] - 1,
+                                    self.current_analysis['total_runs'] - 1)
+                    self.current_analysis['results'][run_index]['hypothesis'] = hypothesis
+                    changed = True
+
+            elif s.startswith('F1 Score:'):
+                # Extract metrics
+                try:
+                    f1_score = float(_F1_RE.match(s).group(1))
+                    run_index = self.current_analysis['current_run'] - 1
+                    if run_index >= 0:
+                        run_index = min(run_index,
+                                        self.current_analysis['total_runs'] - 1)
+                        self.current_analysis['results'][run_index]['f1_score'] = f1_score
+                        changed = True
+                        # The F1 line closes out a run's result entry;
+                        # ship just that one dict to listeners
+                        socketio.emit('analysis_result_added', {
+                            'run_index': run_index,
+                            'result': self.current_analysis['results'][run_index]
+                        })
+                except:
+                    pass
+
+        # Emit progress at most 10x/second, and only the hot subset --
+        # per-line emits of the full dict grew quadratic as the results
+        # list filled. State transitions always go out immediately.
+        now = time.monotonic()
+        if changed or now - self._last_emit_ts > 0.1:
+            socketio.emit('analysis_progress', self._hot_view())
+            self._last_emit_ts = now
     
     def load_final_results(self):
         """Load the final results from the analysis"""
@@ -233,15 +404,16 @@ class AntidoteWebAPI:
             
             for filename in results_files:
                 try:
-                    with open(filename, 'r') as f:
-                        final_results[filename.replace('.json', '')] = json.load(f)
+                    st = os.stat(filename)
+                    final_results[filename.replace('.json', '')] = \
+                        _load_json_cached(filename, st.st_mtime_ns)
                 except FileNotFoundError:
                     continue
             
             self.current_analysis['final_results'] = final_results
             
         except Exception as e:
-            logger.error(f"Failed to load final results: {str(e)}")
+            logger.error("Failed to load final results: %s", str(e))
     
     def get_analysis_status(self):
         """Get current analysis status"""
@@ -280,7 +452,7 @@ Generate only the hypothesis text, no additional explanation."""
             return hypothesis
             
         except Exception as e:
-            logger.error(f"GPT hypothesis generation failed: {str(e)}")
+            logger.error("GPT hypothesis generation failed: %s", str(e))
             raise e
 
 # Global API instance
@@ -289,20 +461,24 @@ api = AntidoteWebAPI()
 # Routes
 @app.route('/')
 def index():
-    return send_from_directory('web', 'functional.html')
+    return send_from_directory('web', 'functional.html', max_age=3600)
 
 @app.route('/enterprise')
 def enterprise():
-    return send_from_directory('web', 'enterprise.html')
+    return send_from_directory('web', 'enterprise.html', max_age=3600)
 
 @app.route('/demo')
 def demo():
-    return send_from_directory('web', 'index.html')
+    return send_from_directory('web', 'index.html', max_age=3600)
 
 @app.route('/api/datasets')
 def get_datasets():
     """Get available datasets"""
-    return jsonify(api.datasets)
+    # Re-discover on demand: the mtime cache makes an unchanged
+    # directory a couple of stat calls instead of a walk, while new or
+    # modified datasets show up without restarting the server.
+    api.datasets = api.discover_datasets()
+    return Response(api.datasets_json(), mimetype='application/json')
 
 @app.route('/api/datasets/<dataset_key>/preview')
 def get_dataset_preview(dataset_key):
@@ -338,7 +514,7 @@ def generate_hypothesis():
         return jsonify({'hypothesis': hypothesis})
         
     except Exception as e:
-        logger.error(f"Hypothesis generation failed: {str(e)}")
+        logger.error("Hypothesis generation failed: %s", str(e))
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/runs')
@@ -369,7 +545,7 @@ def delete_analysis_run(run_id):
         api.db.delete_run(run_id)
         return jsonify({'success': True, 'message': 'Run deleted successfully'})
     except Exception as e:
-        logger.error(f"Failed to delete run {run_id}: {str(e)}")
+        logger.error("Failed to delete run %s: %s", run_id, str(e))
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/runs/save-current', methods=['POST'])
@@ -408,7 +584,7 @@ def save_current_analysis():
         return jsonify({'success': True, 'run_id': run_id})
         
     except Exception as e:
-        logger.error(f"Failed to save analysis: {str(e)}")
+        logger.error("Failed to save analysis: %s", str(e))
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/runs/save-complete', methods=['POST'])
@@ -461,11 +637,11 @@ def save_complete_analysis():
             data.get('duration_seconds', 0)
         )
         
-        logger.info(f"Saved complete analysis run {run_id}")
+        logger.info("Saved complete analysis run %s", run_id)
         return jsonify({'success': True, 'run_id': run_id})
         
     except Exception as e:
-        logger.error(f"Failed to save complete analysis: {str(e)}")
+        logger.error("Failed to save complete analysis: %s", str(e))
         return jsonify({'error': str(e)}), 500
 
 # WebSocket events
@@ -488,4 +664,9 @@ if __name__ == '__main__':
     print("Available datasets:", list(api.datasets.keys()))
     print("Server running at: http://localhost:5002")
     
-    socketio.run(app, debug=True, host='0.0.0.0', port=5002, allow_unsafe_werkzeug=True)
\ No newline at end of file
+    # Debug mode (werkzeug debugger + its middleware) is opt-in; the
+    # reloader stays off either way since its parent process would run a
+    # second dataset discovery and double every startup cost
+    debug_mode = os.environ.get('FLASK_DEBUG') == '1'
+    socketio.run(app, debug=debug_mode, use_reloader=False,
+                 host='0.0.0.0', port=5002, allow_unsafe_werkzeug=True)
\ No newline at end of file